@@ -1,8 +1,10 @@
 import datetime
+import hashlib
 import random
 import utils
+from collections import Counter, defaultdict
 from constants import STATE
-from copy import deepcopy
+from copy import copy
 from election import Ballot, Voter
 
 
@@ -11,15 +13,21 @@ class Node:
 
     def __init__(self, public_key, private_key):
         self.public_key = public_key
+        self.address = utils.get_public_key_bytes(public_key)  # key of the node in node mappings
         self._private_key = private_key
-        self.verified_transactions = set()  # transactions that were verified. includes created transactions
+        self.verified_transactions = []  # transactions that were verified. includes created transactions
+        self._verified_ids = set()  # ids of the verified transactions, so that each transaction is stored once
         self.rejected_transactions = set()  # transactions that were rejected. may be marked for not counting
 
     def set_node_mapping(self, node_dict):
-        """Sets mapping for public key addresses to each node in the network"""
-        node_dict.pop(hash(self.public_key), None)  # remove current node's own mapping
+        """Sets mapping for public key addresses to each node in the network. The mapping may include the
+        current node itself; it is not modified, so one (read-only) mapping can be shared by all nodes."""
         self.node_mapping = node_dict
 
+    def get_other_nodes(self):
+        """Returns list of the nodes in the network, excluding the current node"""
+        return [node for node in self.node_mapping.values() if node is not self]
+
     def create_transaction(self):
         """Abstract method that to allow node to create transaction specific to blockchain. Should return boolean indicating success"""
         pass
@@ -30,28 +38,59 @@ class Node:
 
     def add_transaction(self, transaction):
         """Verifies an incoming transaction and adds it to the local computer"""
-        # check that source is trusted and validate transaction
-        valid = self.is_node_in_network(transaction.node.public_key) and Transaction.verify_transaction(transaction)
-        if valid:
-            if not transaction.timestamped:
-                # only for untimestamped vote transactions
-                self.pending_transactions.add(transaction)
+        self.add_transactions([transaction])
+
+    def add_transactions(self, transactions):
+        """Verifies a batch of incoming transactions and adds them to the local computer. Signatures
+        of the whole batch are verified together rather than one transaction at a time."""
+        Node.deliver_transactions([self], transactions)
+
+    @staticmethod
+    def deliver_transactions(nodes, transactions):
+        """Sends transactions to each of the given nodes, which verify them and add them to their local computer.
+        Every node checks its own copy of each transaction, but the signature checks of all nodes are verified
+        as a single batch so that the work of the different nodes runs in parallel."""
+        # each node checks that the source is trusted; signatures of trusted transactions are verified
+        trusted = [[tx for tx in transactions if node.is_node_in_network(tx.node.address)] for node in nodes]
+        verified = iter(Transaction.verify_transactions([tx for node_trusted in trusted for tx in node_trusted]))
+
+        for node, node_trusted in zip(nodes, trusted):
+            valid_ids = set()
+            for tx in node_trusted:
+                if next(verified):
+                    valid_ids.add(id(tx))
+            node._store_transactions(transactions, valid_ids)
+
+    def _store_transactions(self, transactions, valid_ids):
+        """Adds transactions whose id is in valid_ids to the local computer and rejects the rest"""
+        for transaction in transactions:
+            if id(transaction) in valid_ids:
+                if not transaction.timestamped:
+                    # only for untimestamped vote transactions
+                    self.pending_transactions.append(transaction)
+                else:
+                    self._add_verified_transaction(transaction)
             else:
-                self.verified_transactions.add(transaction)
-        else:
-            print('transaction was rejected!')
-            self.rejected_transactions.add(transaction)
+                print('transaction was rejected!')
+                self.rejected_transactions.add(transaction)
+
+    def _add_verified_transaction(self, transaction):
+        """Adds a verified transaction unless it was stored before. The same transaction object is received
+        more than once when several nodes broadcast it."""
+        if id(transaction) not in self._verified_ids:
+            self._verified_ids.add(id(transaction))
+            self.verified_transactions.append(transaction)
 
     def create_block(self):
         """"""
         pass
 
-    def is_node_in_network(self, public_key):
-        """Returns whether or not public key is one of the recognized nodes"""
-        return hash(public_key) in self.node_mapping
+    def is_node_in_network(self, address):
+        """Returns whether or not address (see Node.address) is one of the recognized nodes"""
+        return address in self.node_mapping
 
     def sign_message(self, message):
-        """Signs a string or bytes message using the RSA algorithm"""
+        """Signs a string or bytes message using the Ed25519 algorithm"""
         return utils.sign(message, self._private_key)
 
 
@@ -61,15 +100,15 @@ class VotingComputer(Node):
 
     def __init__(self, *args):
         super(VotingComputer, self).__init__(*args)
-        self.pending_transactions = set()  # transactions waiting to be timestamped and broadcasted
+        self.pending_transactions = []  # transactions waiting to be timestamped and broadcasted
     
     def set_ballot_generator(self, ballot_generator):
         """Stores reference to ballot generator so that VotingComputer accepts its transactions"""
         self.ballot_generator = ballot_generator
 
-    def is_node_in_network(self, public_key):
-        """Returns whether or not public key belongs to one of the recognized nodes OR the ballot generator."""
-        return hash(public_key) in self.node_mapping or public_key == self.ballot_generator.public_key
+    def is_node_in_network(self, address):
+        """Returns whether or not address belongs to one of the recognized nodes OR the ballot generator."""
+        return address in self.node_mapping or address == self.ballot_generator.address
 
     def validate_ballot(self, ballot):
         """Ensures that ballot is legitimate and filled out properly and returns boolean for validity"""
@@ -90,7 +129,7 @@ class VotingComputer(Node):
 
         if ballot_issued:
             tx = VoteTransaction(ballot, self, STATE.ISSUED, STATE.USED, timestamped=False)
-            self.pending_transactions.add(tx)
+            self.pending_transactions.append(tx)
             return True
         else:
             print('ballot was never issued!')
@@ -98,12 +137,16 @@ class VotingComputer(Node):
 
     def broadcast_transactions(self):
         """Timestamps, signs and sends pending transactions to all nodes (once there is enough statistical variation)"""
-        VoteTransaction.timestamp_and_sign_transactions(self.pending_transactions)
-        for tx in self.pending_transactions:
-            self.add_transaction(tx)  # treats pending transaction as an incoming transaction
-            for node in self.node_mapping.values():
-                node.add_transaction(tx)
-        self.pending_transactions = set()  # reset
+        # a transaction may have been received more than once; keep the first occurrence of each
+        transactions = list(dict.fromkeys(self.pending_transactions))
+        # send ballot issuances ahead of ballot usages, so nodes receive them in the order they are applied
+        issued = [tx for tx in transactions if tx.new_state == STATE.ISSUED]
+        used = [tx for tx in transactions if tx.new_state == STATE.USED]
+        transactions = issued + used
+        VoteTransaction.timestamp_and_sign_transactions(transactions)
+        # treats pending transactions as incoming transactions
+        Node.deliver_transactions([self] + self.get_other_nodes(), transactions)
+        self.pending_transactions = []  # reset
 
 
 class VoterComputer(Node):
@@ -127,15 +170,13 @@ class VoterComputer(Node):
     def create_transaction(self, voter):
         tx = VoterTransaction(voter, self, STATE.NOT_VOTED, STATE.VOTED, timestamped=True)
         # computer automatically verifies self-created transactions
-        self.verified_transactions.add(tx)
+        self._add_verified_transaction(tx)
         # broadcast to nodes right away
         self.broadcast_transactions([tx])
         return True
 
     def broadcast_transactions(self, transactions):
-        for transaction in transactions:
-            for node in self.node_mapping.values():
-                node.add_transaction(transaction)
+        Node.deliver_transactions(self.get_other_nodes(), transactions)
 
 
 class AdversaryVotingComputer(VotingComputer):
@@ -158,8 +199,12 @@ class BallotGenerator(Node):
         ballots = []
         if num_ballots:
             for i in range(num_ballots):
-                ballots.append(Ballot(election, utils.get_deep_copy_of_list(items)))
+                ballot = Ballot(election, [item.clone() for item in items])
+                # contents signed when the ballot is issued never change (and are cached), so build them now
+                ballot.get_signature_contents(include_chosen=False)
+                ballots.append(ballot)
         self.ballots = tuple(ballots)  # master list
+        self.ballot_ids = frozenset(ballot.id for ballot in ballots)  # for constant time legitimacy checks
         self.available_ballots = list(ballots)
         return ballots
 
@@ -169,8 +214,12 @@ class BallotGenerator(Node):
     def retrieve_ballot(self):
         """Returns a random ballot and creates transaction for change in ballot state"""
         if self.are_ballots_available():
-            ballot = random.choice(self.available_ballots)      
-            self.available_ballots.remove(ballot)
+            # swap a random ballot with the last one and pop it, which avoids searching the list for it
+            index = random.randrange(len(self.available_ballots))
+            last = len(self.available_ballots) - 1
+            self.available_ballots[index], self.available_ballots[last] = \
+                self.available_ballots[last], self.available_ballots[index]
+            ballot = self.available_ballots.pop()
             # create transaction and notify all voting computers
             self.create_transaction(ballot)
             return ballot
@@ -178,14 +227,13 @@ class BallotGenerator(Node):
 
     def is_legitimate_ballot(self, ballot):
         """Returns whether ballot was generated by BallotGenerator"""
-        return ballot in self.ballots
+        return ballot.id in self.ballot_ids
 
     def create_transaction(self, ballot):
         """Creates (untimestamped) transaction indicating that ballot was issued and sends this to all voting computers."""
         tx = VoteTransaction(ballot, self, STATE.CREATED, STATE.ISSUED, timestamped=False, include_chosen=False)
         # add transaction to all voting machines
-        for voting_machine in self.node_mapping.values():
-            voting_machine.add_transaction(tx)
+        Node.deliver_transactions(self.get_other_nodes(), [tx])
         return True
 
 
@@ -194,11 +242,12 @@ class Transaction:
     or may not be timestamped. Here state loosely correlates to address or owner. For example, 
     I can cast a ballot to "Barack Obama" - which would be the new state of my ballot"""
 
+    __slots__ = ('content', 'signature_kwargs', 'previous_state', 'new_state', 'node', 'timestamped', 'time',
+                 'signature', '_digest')
     allowed_states = None  # will define valid states for the transaction
-    timestamped = True  # by default, all Transactions are timestamped
     content_class = None  # defines the expected class of the content
 
-    def __init__(self, content, node, previous_state, new_state, timestamped=timestamped, **signature_kwargs):
+    def __init__(self, content, node, previous_state, new_state, timestamped=True, **signature_kwargs):
         """Transaction consists of some content, an issuing node (public key), the signed
         content(including timestamp), and depending on the use case, a timestamp, which is 
         enabled by default
@@ -211,10 +260,8 @@ class Transaction:
             timestamped         whether or not this transaction should be timestamped
             signature_kwargs    key word arguments to control signature
         """
-        if type(content) is not self.content_class:
-            raise Exception('Unexpected transaction content!')
-        if getattr(content, 'get_signature_contents') is None:
-            raise Exception(str(content_class) + ' needs to implement method get_signature_contents')
+        if __debug__ and type(content) is not self.content_class:
+            raise Exception('Unexpected transaction content!')  # checked only when not running with python -O
         self.content = content
         self.signature_kwargs = signature_kwargs
         if previous_state in self.allowed_states and new_state in self.allowed_states:
@@ -227,13 +274,14 @@ class Transaction:
         if timestamped:
             self.time = datetime.datetime.now()
         self.signature = node.sign_message(self.get_signature_contents(**self.signature_kwargs))
+        self._digest = None  # cached by get_hash
 
     def get_signature_contents(self, **signature_kwargs):
         """Produces unique string representation of a transaction which is then signed. 
         Adds timestamp if present."""
         str_list = [self.content.get_signature_contents(**signature_kwargs),
-                    self.previous_state,
-                    self.new_state]
+                    str(int(self.previous_state)),
+                    str(int(self.new_state))]
         if self.timestamped:
             str_list.append(self.get_time_str())
         return ":".join(str_list)
@@ -241,6 +289,12 @@ class Transaction:
     def __str__(self):
         return str(self.signature)
 
+    def get_hash(self):
+        """Returns the hash of the transaction (string, as hexadecimal digest), cached until it is signed again"""
+        if self._digest is None:
+            self._digest = utils.get_hash(self)
+        return self._digest
+
     def get_time_str(self):
         if self.timestamped:
             return utils.get_formatted_time_str(self.time)
@@ -249,13 +303,22 @@ class Transaction:
     @staticmethod
     def verify_transaction(transaction):
         """Validates a transaction's signature and returns whether its content matches its hash"""
-        return utils.verify_signature(transaction.get_signature_contents(**transaction.signature_kwargs), transaction.signature, transaction.node.public_key)
+        return Transaction.verify_transactions([transaction])[0]
+
+    @staticmethod
+    def verify_transactions(transactions):
+        """Validates the signatures of a batch of transactions. Returns a list of booleans in the same order."""
+        messages = [tx.get_signature_contents(**tx.signature_kwargs) for tx in transactions]
+        signatures = [tx.signature for tx in transactions]
+        addresses = [tx.node.address for tx in transactions]
+        return utils.verify_batch(messages, signatures, addresses)
 
 
 class VoteTransaction(Transaction):
-    """Class for transactions related to the state of ballots"""
-    allowed_states = [STATE.CREATED, STATE.ISSUED, STATE.USED]
-    timestamped = False  # we do not timestamp vote transactions when they are created
+    """Class for transactions related to the state of ballots. Note: we do not timestamp vote transactions
+    when they are created (timestamped=False); they are timestamped when they are broadcasted."""
+    __slots__ = ()
+    allowed_states = frozenset([STATE.CREATED, STATE.ISSUED, STATE.USED])
     content_class = Ballot
 
     def add_timestamp(self, time=None):
@@ -271,13 +334,15 @@ class VoteTransaction(Transaction):
         now = datetime.datetime.now()
         for tx in transactions:
             tx.add_timestamp(time=now)
-            # overwrite old signature
-            tx.signature = tx.node.sign_message(tx.get_signature_contents()) 
+            # overwrite old signature; the cached hash no longer applies
+            tx.signature = tx.node.sign_message(tx.get_signature_contents(**tx.signature_kwargs))
+            tx._digest = None
 
 
 class VoterTransaction(Transaction):
     """Class for transactions related to the state of voters"""
-    allowed_states = [STATE.NOT_VOTED, STATE.VOTED]
+    __slots__ = ()
+    allowed_states = frozenset([STATE.NOT_VOTED, STATE.VOTED])
     content_class = Voter
 
 
@@ -289,17 +354,28 @@ class Ledger:
         self.ledger = dict()
 
     def get_copy(self):
-        """Returns copy of ledger object. This is useful in blocks, which contains its own ledger."""
-        return deepcopy(self)
+        """Returns copy of ledger object. This is useful in blocks, which contains its own ledger. Only the
+        ledger dictionary is copied; its keys (ballots, voters, candidates) are shared with the original."""
+        ledger_copy = copy(self)
+        ledger_copy.ledger = self.ledger.copy()
+        return ledger_copy
 
     def get_hash(self):
-        """Returns unique hash of Ledger"""
-        return hash(str(self.ledger))
+        """Returns unique hash (string, as hexadecimal digest) of Ledger, fed one length-prefixed field at a time"""
+        ledger_hash = hashlib.blake2b(digest_size=32)
+        for key, value in self.ledger.items():
+            key_str = str(int(key)) if isinstance(key, STATE) else str(key)  # str(STATE) varies by Python version
+            for field in (type(key).__name__, key_str, str(int(value))):
+                field = field.encode()
+                ledger_hash.update(len(field).to_bytes(4, 'big'))
+                ledger_hash.update(field)
+        return ledger_hash.hexdigest()
 
 
 class VoteLedger(Ledger):
     """Ledger that stores state of ballots, total votes for candidates as well as collective 
     totals of created, issued, and used ballots."""
+    state_order = {STATE.CREATED: 0, STATE.ISSUED: 1, STATE.USED: 2}  # order in which ballots change state
 
     def __init__(self, ballots):
         """
@@ -328,39 +404,39 @@ class VoteLedger(Ledger):
         """Updates the ledger based on the provided transactions. Note: Two logical types of transactions can
         be applied to ballots: tx: ballot.created -> ballot.issued and tx: ballot.issued -> ballot.used. They 
         must be applied in the specified order; transactions passed here are not guaranteed to be in the right
-        order. That is why we loop over the transactions twice.
+        order. That is why we group the transactions by ballot and sort each group by previous state first.
         
         Args:
             transactions        list of VoteTransaction objects
         """
-        for iteration in range(2):    
-            for transaction in transactions:
-                if iteration == 1 and transaction._reiterate is False:
-                    continue
+        ledger = self.ledger
+        totals = Counter()  # changes to collective ballot totals and candidate votes; added to ledger at the end
+        transactions_by_ballot = defaultdict(list)
+        for transaction in transactions:
+            transactions_by_ballot[transaction.content].append(transaction)
 
-                ballot = transaction.content
-                old_state = self.ledger[ballot]
+        for ballot, ballot_transactions in transactions_by_ballot.items():
+            ballot_transactions.sort(key=lambda tx: self.state_order[tx.previous_state])
+            for transaction in ballot_transactions:
+                old_state = ledger[ballot]
                 tx_previous_state = transaction.previous_state
                 tx_new_state = transaction.new_state
 
                 if tx_previous_state != old_state:
-                    # if transaction does not line up with ledger state, mark so that we come back to it
-                    transaction._reiterate = True
-                    continue
+                    continue  # transaction does not line up with ledger state
                 
                 # update individual ballot state
-                self.ledger[ballot] = tx_new_state
+                ledger[ballot] = tx_new_state
 
                 # update collective ballots
-                self.ledger[old_state] = self.ledger[old_state] - 1
-                self.ledger[tx_new_state] = self.ledger[tx_new_state] + 1
+                totals[old_state] -= 1
+                totals[tx_new_state] += 1
 
                 # update candidate votes
-                candidates = ballot.get_selected_choices()
-                for candidate in candidates:
-                    self.ledger[candidate] = self.ledger[candidate] + 1
-                
-                transaction._reiterate = False
+                totals.update(ballot.get_selected_choices())
+
+        for key, change in totals.items():
+            ledger[key] = ledger[key] + change
 
 
 class VoterLedger(Ledger):
@@ -409,6 +485,7 @@ class VoterLedger(Ledger):
 
 class Block:
     """Block in a blockchain that contains transactions and references the previous block, if any."""
+    __slots__ = ('transactions', 'previous_block', 'ledger', 'time', 'header', 'node', '_digest')
     ledger_class = None
 
     def __init__(self, transactions, ledger, node, prev_block=None):
@@ -420,27 +497,30 @@ class Block:
 
         self.ledger = ledger  # current ledger at time of creation of block
         self.time = datetime.datetime.now()
-        self.header = node.sign_message(Block.get_hash(self))
+        self.header = node.sign_message(self.get_signature_contents())
         self.node = node
+        self._digest = None  # cached by get_hash
 
     def __eq__(self, other):
         return self.header == other.header
 
+    def __str__(self):
+        return str(self.header)
+
+    def get_hash(self):
+        """Returns the hash of the block (string, as hexadecimal digest), cached since the header never changes"""
+        if self._digest is None:
+            self._digest = utils.get_hash(self)
+        return self._digest
+
     def get_signature_contents(self, **signature_kwargs):
-        """"""
-        str_list = []
-        if self.previous_block:
-            str_list.append(self.previous_block.header)
-        else:
-            str_list.append('')  # no previous block
-        
-        for tx in block.transactions:
-            # get the hash of each transaction, append to digest
-            str_list.append(tx.signature.decode())
-        str_list.append(self.ledger.get_hash())
-        str_list.append(utils.get_formatted_time_str(self.time))  # add time
-        hash_content = ":".join(str_list)
-        return hash_content
+        """Produces the bytes that are signed as the block header: the previous block's header, the signature
+        of each transaction, the hash of the ledger and the time the block was created."""
+        previous_header = self.previous_block.header if self.previous_block else b''  # b'' if no previous block
+        return b":".join([previous_header,
+                          *(tx.signature for tx in self.transactions),
+                          self.ledger.get_hash().encode(),
+                          utils.get_formatted_time_str(self.time).encode()])
 
     def is_genesis_block(self):
         """Returns whether block is the first (genesis) block in the blockchain"""
@@ -453,11 +533,13 @@ class Block:
 
 class VoteBlock(Block):
     """Block that is stored in VoteBlockchain."""
+    __slots__ = ()
     ledger_class = VoteLedger
 
 
 class VoterBlock(Block):
     """Block that is stored in VoterBlockchain."""
+    __slots__ = ()
     ledger_class = VoterLedger
 
 
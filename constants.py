@@ -1,14 +1,18 @@
-class STATE:
-    """Various states that entities can be in"""
+from enum import IntEnum
+
+
+class STATE(IntEnum):
+    """Various states that entities can be in. Integers make state comparisons and ledger lookups cheap."""
 
     # voter states
-    NOT_VOTED = 'not voted'
-    VOTED = 'voted'
+    NOT_VOTED = 0
+    VOTED = 1
 
     # ballot states
-    CREATED = 'ballot_created'
-    ISSUED = 'ballot_issued'
-    USED = 'ballot_used'
+    CREATED = 2
+    ISSUED = 3
+    USED = 4
+
 
-    # consensus variables
-    SIGNATURE_ALGORITHM = 'SHA-256'  # algorithm for all signatures
+# consensus variables
+SIGNATURE_ALGORITHM = 'Ed25519'  # algorithm for all signatures
@@ -1,17 +1,24 @@
 # TODO: design configuration for secret/non-secret vote
-import random
+import secrets
 from constants import STATE
-from copy import deepcopy
+from copy import copy, deepcopy
 
 
 class Voter:
     """Simple voter class with a name and unique ID"""
+    __slots__ = ('name', 'id', 'state')
 
     def __init__(self, name, voter_id):
         self.name = name
         self.id = voter_id  # must be unique
         self.state = STATE.NOT_VOTED
 
+    def __deepcopy__(self, memo):
+        """Creates deep copy of Voter. All attributes are immutable, so a shallow copy is enough."""
+        voter = copy(self)
+        memo[id(self)] = voter
+        return voter
+
     def __str__(self):
         return self.id
 
@@ -28,10 +35,19 @@ class Voter:
 class Choice:
     """Represents a ballot choice. For example, `Barack Obama (D)` would be a choice
     for the 2012 Presidential Election ballot."""
+    __slots__ = ('description', 'chosen', '_item')
 
     def __init__(self, description):
         self.description = description
         self.chosen = False
+        self._item = None  # BallotItem that holds this choice; set by the BallotItem
+
+    def __deepcopy__(self, memo):
+        """Creates deep copy of Choice. The copy is linked to a BallotItem once it is added to one."""
+        choice = Choice(self.description)
+        choice.chosen = self.chosen
+        memo[id(self)] = choice
+        return choice
 
     def __str__(self):
         return ":".join([self.description, str(self.chosen)])
@@ -46,30 +62,43 @@ class Choice:
 
     def select(self):
         self.chosen = True
+        self._selection_changed()
 
     def unselect(self):
         self.chosen = False
+        self._selection_changed()
+
+    def _selection_changed(self):
+        """Notifies the BallotItem holding this choice that its signature contents are outdated"""
+        if self._item is not None:
+            self._item.clear_signature_contents()
 
 
 class BallotItem:
     """Represents an item or a POSITION in an election that is represented on a ballot. Ballots can have multiple
     BallotItems that voters can vote on. Moreover, a ballot item can allow one or more selections."""
+    __slots__ = ('title', 'description', 'max_choices', 'choices', '_signature_contents')
 
     def __init__(self, title, description, max_choices, choices):
         self.title = title
         self.description = description
         self.max_choices = max_choices
         self.choices = choices
+        self._signature_contents = {}  # cached signature contents, keyed by include_chosen
+        for choice in choices:
+            choice._item = self
 
     def __deepcopy__(self, memo):
-        """Creates deep copy of Ballot Item. 
-        Code from: https://stackoverflow.com/questions/1500718/what-is-the-right-way-to-override-the-copy-deepcopy-operations-on-an-object-in-p"""
-        cls = self.__class__
-        result = cls.__new__(cls)
-        memo[id(self)] = result
-        for k, v in self.__dict__.items():
-            setattr(result, k, deepcopy(v, memo))
-        return result
+        """Creates deep copy of Ballot Item through its constructor, keeping the selected choices."""
+        choices = [deepcopy(choice, memo) for choice in self.choices]
+        item = BallotItem(self.title, self.description, self.max_choices, choices)
+        memo[id(self)] = item
+        return item
+
+    def clone(self):
+        """Returns a new ballot item with the same content and unselected choices. Much faster than deepcopy."""
+        return BallotItem(self.title, self.description, self.max_choices,
+                          [Choice(choice.description) for choice in self.choices])
 
     def __str__(self):
         str_list = [self.title, self.description, str(self.max_choices)]
@@ -78,10 +107,18 @@ class BallotItem:
         return ":".join(str_list)
 
     def get_signature_contents(self, **signature_kwargs):
-        str_list = [self.title, self.description, str(self.max_choices)]
-        for choice in self.choices:
-            str_list.append(choice.get_signature_contents(**signature_kwargs))
-        return ":".join(str_list)
+        include_chosen = signature_kwargs.get('include_chosen', True)
+        contents = self._signature_contents.get(include_chosen)
+        if contents is None:
+            str_list = [self.title, self.description, str(self.max_choices)]
+            for choice in self.choices:
+                str_list.append(choice.get_signature_contents(**signature_kwargs))
+            contents = self._signature_contents[include_chosen] = ":".join(str_list)
+        return contents
+
+    def clear_signature_contents(self):
+        """Clears cached signature contents that depend on the selected choices"""
+        self._signature_contents.pop(True, None)
 
     def clear(self):
         """Unselects all choices"""
@@ -111,9 +148,18 @@ class Ballot:
     TODO: reassess design"""
 
     def __init__(self, election, items):
-        self.id = str(random.getrandbits(128))  # assign a random ID to the ballot
+        self.id = secrets.token_hex(16)  # assign a random (cryptographically secure) ID to the ballot
         self.election = election
         self.items = items
+        self._signature_contents = None  # cached signature contents without chosen status (never change)
+
+    def __deepcopy__(self, memo):
+        """Creates deep copy of Ballot, keeping its ID. Only the items need to be copied; other attributes
+        are immutable."""
+        ballot = copy(self)
+        memo[id(self)] = ballot
+        ballot.items = [deepcopy(item, memo) for item in self.items]
+        return ballot
 
     def __str__(self):
         str_list = [self.id, self.election]
@@ -122,10 +168,18 @@ class Ballot:
         return ":".join(str_list)
 
     def get_signature_contents(self, **signature_kwargs):
+        include_chosen = signature_kwargs.get('include_chosen', True)
+        if not include_chosen and self._signature_contents is not None:
+            return self._signature_contents
+
         str_list = [self.id, self.election]
         for item in self.items:
+            # items cache their own contents and clear them when a choice is (un)selected
             str_list.append(item.get_signature_contents(**signature_kwargs))
-        return ":".join(str_list)        
+        contents = ":".join(str_list)
+        if not include_chosen:
+            self._signature_contents = contents
+        return contents
 
     def is_filled(self):
         """Returns whether or not each BallotItem has at least one selected choice"""
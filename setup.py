@@ -1,9 +1,9 @@
-import os
+import sys
 import random
+import colorama
 import utils
+from types import MappingProxyType
 from base import VoteLedger, VoterLedger
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.asymmetric import rsa
 
 # from consensus import Consensus
 from base import Node, VotingComputer, BallotGenerator, VoterComputer, Block, VoterBlockchain, VoteBlockchain
@@ -12,34 +12,39 @@ from election import Voter, BallotItem, Choice
 
 def set_up_nodes(NodeClass, num_nodes=50):
     """Generic function to create any type of Node specified, 
-    set its network Nodes, and return a list of Nodes."""
+    set its network Nodes, and return a list of Nodes along with the (read-only) public key-node mapping."""
     nodes = []
     node_mapping = dict()
 
     # create Nodes as well as public_key-node dictionary mapping
     for node in range(num_nodes):
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=512,
-            backend=default_backend()
-        )
-        public_key = private_key.public_key()
+        public_key, private_key = utils.generate_key_pair()
         node = NodeClass(public_key, private_key)
         nodes.append(node)
-        node_mapping[hash(public_key)] = node
+        node_mapping[node.address] = node
 
+    network = MappingProxyType(node_mapping)
     if num_nodes == 1:
-        return nodes  # no need to set mapping for a single Node
+        return nodes, network  # no need to set mapping for a single Node
 
-    # pass key-node mapping of other Nodes in the network to each Node
+    # pass key-node mapping of the Nodes in the network to each Node. All Nodes share one read-only view
     for node in nodes:
-        node.set_node_mapping(dict(node_mapping))  # passes copy rather than reference
-    return nodes
+        node.set_node_mapping(network)
+    return nodes, network
 
 
 class VotingProgram:
     """Main voting program that sets up and runs election"""
 
+    # main menu, built once and printed on every iteration of the election loop
+    menu = "\n".join([
+        "(1) Vote",
+        "(2) View Current Results",
+        "(3) View Logs",
+        "(4) Inspect Ledger",
+        "(5) exit",
+    ]) + "\n"
+
     def set_up_election(self):
         # create (sample) election name & ballot content
         election = "2018 Election"
@@ -76,39 +81,36 @@ class VotingProgram:
         # set up voting computers, voter computers, ballot generator w/ key pairs & blockchain instances
         num_nodes = 5
         print('Setting up voting computers, voter computers, and ballot generator')
-        self.voting_computers = set_up_nodes(VotingComputer, num_nodes=num_nodes)
-        self.voter_computers = set_up_nodes(VoterComputer, num_nodes=num_nodes)
-        self.ballot_generator = set_up_nodes(BallotGenerator, num_nodes=1)[0]
-        # give ballot generator mapping of voting computers
-        self.ballot_generator.set_node_mapping(
-            {hash(node.public_key): node for node in
-             self.voting_computers}
-        )  # give ballot generator mapping of voting computers
+        self.voting_computers, voting_computer_mapping = set_up_nodes(VotingComputer, num_nodes=num_nodes)
+        self.voter_computers, _ = set_up_nodes(VoterComputer, num_nodes=num_nodes)
+        ballot_generators, _ = set_up_nodes(BallotGenerator, num_nodes=1)
+        self.ballot_generator = ballot_generators[0]
+        # give ballot generator (the same read-only) mapping of voting computers
+        self.ballot_generator.set_node_mapping(voting_computer_mapping)
 
         # set ballot generator for each voting computer
         for voting_computer in self.voting_computers:
             voting_computer.set_ballot_generator(self.ballot_generator)
 
         # TODO: construct adversary nodes & add to network
-        adversary_node = set_up_nodes(VotingComputer, num_nodes=2)
+        adversary_node, _ = set_up_nodes(VotingComputer, num_nodes=2)
 
         # create finalized voter roll
         # The people who are actually allowed to vote / registered to vote
         print('Finalizing voter roll')
         self.voter_roll = [Voter('Mateusz Gembarzewski', '1'),
                            Voter('Jai Punjwani', '2')]
+        # index the voter roll by ID so that voters are looked up in constant time when they authenticate
+        self._voter_by_id = {voter.id: voter for voter in self.voter_roll}
 
         # generate ballots using the election and ballot content. generate same number of ballots as registered voters
         # Each Voter who becomes validated to vote should receive 1 ballot.
         print('Voter registration closed. Generating {} ballots'.format(len(self.voter_roll)))
         ballots = self.ballot_generator.generate_ballots(election, items, num_ballots=len(self.voter_roll))
 
-        # ensure that ballot IDs are unique by adding all IDs to a master set & checking that set length = ballot list length
-        ballot_ids = set()
-        for ballot in ballots:
-            ballot_ids.add(ballot.id)
-
-        if len(ballot_ids) != len(ballots):
+        # ensure that ballot IDs are unique by checking that the ballot generator's master set of IDs
+        # has the same length as the ballot list
+        if len(self.ballot_generator.ballot_ids) != len(ballots):
             raise Exception("Generated non-unique ballot")
 
         # holds filled out ballots. TODO: use this
@@ -125,6 +127,7 @@ class VotingProgram:
     def begin_election(self):
         """Main entry point to begin the election program"""
         exit = False
+        colorama.init()  # translates the ANSI sequences used by clear_screen for the Windows console
         print('Start of election!')
         ballots_available = True
         while not exit and ballots_available:
@@ -140,15 +143,14 @@ class VotingProgram:
         # annouce results?
 
     def print_menu(self):
-        print("(1) Vote")
-        print("(2) View Current Results")
-        print("(3) View Logs")
-        print("(4) Inspect Ledger")
-        print("(5) exit")
-        print()
+        print(self.menu)
 
     def clear_screen(self):
-        os.system('cls||clear')
+        """Clears the terminal with an ANSI escape sequence (see colorama.init in begin_election); does nothing
+        when output is not a terminal"""
+        if sys.stdout.isatty():
+            sys.stdout.write('\x1b[2J\x1b[H')
+            sys.stdout.flush()
 
     def handle_input(self, menu_number):
         """Redirects user to appropriate method and returns whether or not program should exit"""
@@ -219,10 +221,7 @@ class VotingProgram:
 
     def get_voter_by_id(self, id):
         """Getting voter name via provided ID"""
-        for voter in self.voter_roll:
-            if voter.id == id:
-                return voter
-        return None
+        return self._voter_by_id.get(id)
 
     def print_ballot(self, ballot):
         """Prints out ballot"""
@@ -248,9 +247,11 @@ class VotingProgram:
                 print(" ".join(choice_str_list))
                 choice_num = choice_num + 1
 
+            # a range checks membership of an int in constant time, without building a list
+            allowed_selections = range(1, len(item.choices)+1)
             candidate_selection = utils.get_input_of_type("Please enter the number of the candidate to bubble in your optical scan ballot: ", 
                                                           int, 
-                                                          list(range(1, len(item.choices)+1))
+                                                          allowed_selections
             )
             candidate_index = candidate_selection - 1
             confirmed = utils.get_input_of_type("Enter 'y' to confirm selection or 'n' to reject. " + item.choices[candidate_index].description + ": ",
@@ -267,8 +268,9 @@ class VotingProgram:
     def show_consensus(self):
         """Demonstrates consensus for both VoterBlockchain and VoteBlockchain"""
         # all voting computers broadcast transactions (includes timestamping & signing)
+        # (signatures for all receiving nodes are verified as one batch; see Node.deliver_transactions)
         for voting_computer in self.voting_computers:
-            voting_computers.broadcast_transactions()
+            voting_computer.broadcast_transactions()
 
         # now all nodes have a list of their approved transactions
         # each node gets copy of last ledger from last block
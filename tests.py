@@ -1,11 +1,12 @@
 import random
 import unittest
-import rsa
 import datetime
 import utils
+from types import MappingProxyType
 from copy import deepcopy
 from constants import STATE
-from base import Node, BallotGenerator, VoteLedger, VoteTransaction, VotingComputer
+from base import Node, BallotGenerator, Ledger, VoteLedger, VoteTransaction, VoterComputer, VoterTransaction, \
+    VotingComputer
 from election import Voter, Choice, Ballot, BallotItem
 from setup import set_up_nodes
 from utils import verify_signature
@@ -14,26 +15,56 @@ from utils import verify_signature
 class TestUtilsClass(unittest.TestCase):
 
     def setUp(self):
-        (pubkey, privkey) = rsa.newkeys(512)
+        (pubkey, privkey) = utils.generate_key_pair()
         self.pubkey = pubkey
         self.privkey = privkey
 
     def test_verify_signature(self):
         message = "nooneknows"
         message_encoded = message.encode('utf8')
-        signature = rsa.sign(message_encoded, self.privkey, "SHA-256")
+        signature = utils.sign(message_encoded, self.privkey)
         actual = utils.verify_signature(message_encoded, signature, self.pubkey)
         self.assertTrue(actual, True)
 
+    def test_verify_batch(self):
+        node = set_up_nodes(VotingComputer, num_nodes=1)[0][0]
+        messages = ["message " + str(i) for i in range(utils.PARALLEL_VERIFY_THRESHOLD + 1)]
+        signatures = [node.sign_message(message) for message in messages]
+        signatures[1] = signatures[0]  # tamper with one signature
+        actual = utils.verify_batch(messages, signatures, [node.address] * len(messages))
+        self.assertEqual(len(actual), len(messages))
+        self.assertFalse(actual[1])
+        self.assertTrue(all(actual[:1] + actual[2:]))
+
+    def test_verify_batch_repeated(self):
+        node = set_up_nodes(VotingComputer, num_nodes=1)[0][0]
+        signature = node.sign_message("message")
+        # repeated checks of the same signature are answered the same way, but changed contents are not
+        actual = utils.verify_batch(["message", "message", "changed"], [signature] * 3, [node.address] * 3)
+        self.assertEqual(actual, [True, True, False])
+        self.assertEqual(utils.verify_batch(["message"], [signature], [node.address]), [True])
+
     def test_get_input_of_type(self):
         message = "test message"
         self.assertTrue(type(message), str())
 
     def test_get_hash(self):
-        pass
+        choice = Choice("Jill Steel (G)")
+        unselected_hash = utils.get_hash(choice)
+        self.assertEqual(utils.get_hash(choice), unselected_hash)
+
+        # hash follows the contents of the object, even after it was cached
+        choice.select()
+        self.assertNotEqual(utils.get_hash(choice), unselected_hash)
+        choice.unselect()
+        self.assertEqual(utils.get_hash(choice), unselected_hash)
 
     def test_formatted_time_str(self):
-        pass
+        time = datetime.datetime(2018, 11, 6, 9, 5, 30, 250)
+        self.assertEqual(utils.get_formatted_time_str(time), "2018-11-06 09:05")
+        # times within the same minute are formatted the same
+        self.assertEqual(utils.get_formatted_time_str(time.replace(second=59)), "2018-11-06 09:05")
+        self.assertEqual(utils.get_formatted_time_str(time.replace(minute=6)), "2018-11-06 09:06")
 
 
 class TestVotingProgram(unittest.TestCase):
@@ -69,6 +100,26 @@ class TestBallotClass(unittest.TestCase):
     def test_get_id(self):
         self.assertEqual(self.test_ballot_obj.id, self.test_ballot_obj.get_id())
 
+    def test_signature_contents(self):
+        item = BallotItem("President", "President of the United States", 1, [Choice("A"), Choice("B")])
+        ballot = Ballot("2018", [item])
+        contents = ballot.get_signature_contents()
+        unfilled_contents = ballot.get_signature_contents(include_chosen=False)
+
+        # cached contents follow the selection of a choice
+        item.choices[0].select()
+        selected_contents = ballot.get_signature_contents()
+        self.assertNotEqual(selected_contents, contents)
+        item.choices[0].unselect()
+        self.assertNotEqual(ballot.get_signature_contents(), selected_contents)
+        self.assertEqual(ballot.get_signature_contents(), contents)
+        self.assertEqual(ballot.get_signature_contents(include_chosen=False), unfilled_contents)
+
+        # choices of a copied ballot belong to the copied item
+        copied_item = deepcopy(ballot).items[0]
+        for choice in copied_item.choices:
+            self.assertIs(choice._item, copied_item)
+
 
 class TestBallotItemClass(unittest.TestCase):
     def setUp(self):
@@ -131,21 +182,38 @@ class TestVoterClass(unittest.TestCase):
 
     def test_vote(self):
         self.test_voter.vote()
-        self.assertEqual(self.test_voter.state, 'voted')
+        self.assertEqual(self.test_voter.state, STATE.VOTED)
 
 
 class TestNodeClass(unittest.TestCase):
     """Class to test common behavior of all nodes"""
 
     def setUp(self):
-        (public_key, private_key) = rsa.newkeys(512)
+        (public_key, private_key) = utils.generate_key_pair()
         self.node = Node(public_key, private_key)
-        self.node_mapping = {str(public_key): self.node}
+        self.node_mapping = {self.node.address: self.node}
 
     def test_set_mapping(self):
-        self.node.set_node_mapping(dict(self.node_mapping))
-        # node is supposed to remove its own mapping from dictionary
-        self.assertEqual(self.node.node_mapping, {})
+        self.node.set_node_mapping(MappingProxyType(self.node_mapping))
+        # mapping is shared as is; node is supposed to leave itself out of the other nodes
+        self.assertEqual(self.node.node_mapping, self.node_mapping)
+        self.assertEqual(self.node.get_other_nodes(), [])
+
+    def test_set_up_nodes(self):
+        nodes, node_mapping = set_up_nodes(VotingComputer, num_nodes=3)
+        self.assertEqual(list(node_mapping.values()), nodes)
+        # every node shares the returned read-only mapping
+        for node in nodes:
+            self.assertIs(node.node_mapping, node_mapping)
+            self.assertEqual(len(node.get_other_nodes()), 2)
+
+    def test_add_transactions_once(self):
+        nodes, node_mapping = set_up_nodes(VoterComputer, num_nodes=2)
+        tx = VoterTransaction(Voter('john smith', '1'), nodes[0], STATE.NOT_VOTED, STATE.VOTED)
+        # the same transaction is received from more than one broadcast
+        nodes[1].add_transactions([tx])
+        nodes[1].add_transactions([tx])
+        self.assertEqual(nodes[1].verified_transactions, [tx])
 
     def test_method_name(self):
         # call method here
@@ -153,34 +221,71 @@ class TestNodeClass(unittest.TestCase):
         pass
 
     def test_node_in_network(self):
-        actual = self.node.is_node_in_network(self.node.public_key)
+        actual = self.node.is_node_in_network(self.node.address)
         self.assertTrue(self.node_mapping, actual)
 
     def test_sign_message(self):
         # Encoding our message into bits using .encode()
         message = 'Test Message'.encode()
 
-        # Ciphertext that takes a message and makes a node sign the message
-        cipher = self.node.sign_message(message)
-
-        # plaintext that uses decryption with the private key on the cipher text
-        # Cannot test for encryption equality, because random seed makes encryption results different
-        plaintxt = rsa.decrypt(cipher, self.node._private_key)
+        # Signature that makes a node sign the message with its private key
+        signature = self.node.sign_message(message)
 
-        # tested if node signs message properly
-        self.assertEqual(message, plaintxt,
-                         'Node did not sign message properly')
+        # tested if node signs message properly: signature is verified with the node's public key
+        self.assertTrue(utils.verify_signature(message, signature, self.node.public_key),
+                        'Node did not sign message properly')
 
 
 class TestVotingComputerClass(unittest.TestCase):
     # Testing a VotingComputer
 
     def setUp(self):
-        public_key, private_key = rsa.newkeys(512)
+        public_key, private_key = utils.generate_key_pair()
         self.voting_node = Node(public_key, private_key)
         self.VotingComputer(self.voting_node)
 
 
+class TestBallotGeneratorClass(unittest.TestCase):
+
+    def setUp(self):
+        self.ballot_generator = set_up_nodes(BallotGenerator, num_nodes=1)[0][0]
+        self.ballot_generator.set_node_mapping({})  # no voting computers to notify
+        items = [BallotItem("President", "President of the United States", 1, [Choice("A"), Choice("B")])]
+        self.ballots = self.ballot_generator.generate_ballots("2018 Election", items, num_ballots=3)
+
+    def test_is_legitimate_ballot(self):
+        for ballot in self.ballots:
+            self.assertTrue(self.ballot_generator.is_legitimate_ballot(ballot))
+        other_ballot = Ballot("2018 Election", self.ballots[0].items)
+        self.assertFalse(self.ballot_generator.is_legitimate_ballot(other_ballot))
+
+    def test_retrieve_ballot(self):
+        retrieved = [self.ballot_generator.retrieve_ballot() for ballot in self.ballots]
+        self.assertCountEqual(retrieved, self.ballots)
+        self.assertFalse(self.ballot_generator.are_ballots_available())
+        self.assertIsNone(self.ballot_generator.retrieve_ballot())
+
+
+class TestTransactionClass(unittest.TestCase):
+
+    def setUp(self):
+        self.node = set_up_nodes(VoterComputer, num_nodes=1)[0][0]
+
+    def test_get_hash(self):
+        items = [BallotItem(title="President", max_choices=1, description="President of the United States",
+                            choices=[Choice("Hillary Clinton (D)"), Choice("Donald Trump (R)")])]
+        tx = VoteTransaction(Ballot("2018 Election", items), self.node, STATE.CREATED, STATE.ISSUED,
+                             timestamped=False)
+        tx_hash = tx.get_hash()
+        self.assertEqual(tx_hash, utils.get_hash(tx))
+        self.assertEqual(tx.get_hash(), tx_hash)
+
+        # signing the transaction again changes its hash
+        VoteTransaction.timestamp_and_sign_transactions([tx])
+        self.assertNotEqual(tx.get_hash(), tx_hash)
+        self.assertEqual(tx.get_hash(), utils.get_hash(tx))
+
+
 class TestVoteLedgerClass(unittest.TestCase):
 
     def setUp(self):
@@ -207,10 +312,24 @@ class TestVoteLedgerClass(unittest.TestCase):
         copy = self.vote_ledger.get_copy()
         self.assertNotEqual(hash(copy), hash(self.vote_ledger))
 
+    def test_get_hash(self):
+        copy = self.vote_ledger.get_copy()
+        self.assertEqual(copy.get_hash(), self.vote_ledger.get_hash())
+
+        copy.ledger[STATE.ISSUED] = 1
+        self.assertNotEqual(copy.get_hash(), self.vote_ledger.get_hash())
+
+    def test_get_hash_unambiguous(self):
+        # entries whose strings contain ':' do not run into each other
+        ledger, other_ledger = Ledger(), Ledger()
+        ledger.ledger = {'a:1:2': 3}
+        other_ledger.ledger = {'a': 1, '2': 3}
+        self.assertNotEqual(ledger.get_hash(), other_ledger.get_hash())
+
     def test_add_transactions(self):
         # TODO: determine sub-cases (i.e., different order of transactions)
         
-        node = set_up_nodes(VotingComputer, num_nodes=1)[0]
+        node = set_up_nodes(VotingComputer, num_nodes=1)[0][0]
         # test out of order transaction and ensure that logically earlier transaction is applied first
         txs = [
             VoteTransaction(self.ballots[0], node, STATE.ISSUED, STATE.USED),
@@ -222,6 +341,21 @@ class TestVoteLedgerClass(unittest.TestCase):
         self.assertEqual(self.vote_ledger.ledger[self.ballots[0]], STATE.USED)
         # self.vote_ledger.ledger[]
 
+    def test_apply_transactions_out_of_order(self):
+        node = set_up_nodes(VotingComputer, num_nodes=1)[0][0]
+        txs = [
+            VoteTransaction(self.ballots[0], node, STATE.ISSUED, STATE.USED),
+            VoteTransaction(self.ballots[1], node, STATE.CREATED, STATE.ISSUED),
+            VoteTransaction(self.ballots[0], node, STATE.CREATED, STATE.ISSUED)
+        ]
+        self.vote_ledger.apply_transactions(txs)
+
+        self.assertEqual(self.vote_ledger.ledger[self.ballots[0]], STATE.USED)
+        self.assertEqual(self.vote_ledger.ledger[self.ballots[1]], STATE.ISSUED)
+        self.assertEqual(self.vote_ledger.ledger[STATE.CREATED], 0)
+        self.assertEqual(self.vote_ledger.ledger[STATE.ISSUED], 1)
+        self.assertEqual(self.vote_ledger.ledger[STATE.USED], 1)
+
     
 
 
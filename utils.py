@@ -1,11 +1,23 @@
+import atexit
 import base
+import datetime
 import election
 import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
+from functools import lru_cache
 from cryptography.exceptions import InvalidSignature
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+PARALLEL_VERIFY_THRESHOLD = 64  # smaller batches are verified in-process, since the pool has a startup cost
+VERIFY_WORKERS = os.cpu_count() or 1  # number of processes verifying large batches; 1 means no pool is used
+_verify_pool = None  # lazily created pool of processes used for verifying large batches of signatures
+VERIFY_CACHE_SIZE = 65536  # maximum number of signature verification results that are remembered
+_verify_cache = OrderedDict()  # (message, signature, public key bytes) -> whether signature is valid; in LRU order
+_public_keys_by_bytes = dict()  # raw bytes -> public key, so each process loads each key once
 
 
 
@@ -18,19 +30,22 @@ from cryptography.hazmat.primitives.asymmetric import padding, rsa
 # can be done easily as well. timestamped = True; this changes the message content to sign (and thus for verifying)
 # additionally: to get the content of an object, just override __str__
 
+def generate_key_pair():
+    """Generates and returns a new (public key, private key) pair for signing with Ed25519"""
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    return private_key.public_key(), private_key
+
+
+def get_public_key_bytes(public_key):
+    """Returns the raw 32 bytes of an Ed25519 public key. Unlike the key object, these are stable and comparable."""
+    return public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+
+
 def sign(message, private_key):
+    """Signs a message with an Ed25519 private key. Ed25519 hashes the message internally."""
     if type(message) == str:
         message = message.encode()
-
-    signature = private_key.sign(
-        message,
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.MAX_LENGTH
-        ),
-        hashes.SHA256()
-    )
-    return signature
+    return private_key.sign(message)
 
 
 def verify_signature(message, signature, public_key):
@@ -38,15 +53,7 @@ def verify_signature(message, signature, public_key):
     if type(message) == str:
         message = message.encode()
     try:
-        public_key.verify(
-            signature,
-            message,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        public_key.verify(signature, message)
         return True
     except InvalidSignature:
         print('signature failed validation!')
@@ -55,16 +62,66 @@ def verify_signature(message, signature, public_key):
     return False
 
 
+def _get_verify_pool():
+    global _verify_pool
+    if _verify_pool is None:
+        _verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS)
+        atexit.register(_verify_pool.shutdown)  # stop the worker processes when the program exits
+    return _verify_pool
+
+
+def _verify_one(args):
+    """Verifies a single (message, signature, public key bytes) tuple. Runs in-process or in a worker process."""
+    message, signature, public_key_bytes = args
+    public_key = _public_keys_by_bytes.get(public_key_bytes)
+    if public_key is None:
+        public_key = ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
+        _public_keys_by_bytes[public_key_bytes] = public_key
+    return verify_signature(message, signature, public_key)
+
+
+def verify_batch(messages, signatures, public_keys_bytes):
+    """Verifies a batch of signatures against raw public key bytes and returns a list of booleans aligned by index.
+    Results are cached, and large batches are spread across a pool of processes."""
+    messages = [message.encode() if type(message) == str else message for message in messages]
+    entries = list(zip(messages, signatures, public_keys_bytes))
+    unverified = [entry for entry in dict.fromkeys(entries) if entry not in _verify_cache]
+
+    if VERIFY_WORKERS == 1 or len(unverified) < PARALLEL_VERIFY_THRESHOLD:
+        verified = [_verify_one(entry) for entry in unverified]
+    else:
+        # split the batch into one chunk per worker, so that every worker gets an equal share
+        chunksize = -(-len(unverified) // VERIFY_WORKERS)
+        verified = list(_get_verify_pool().map(_verify_one, unverified, chunksize=chunksize))
+
+    for entry, valid in zip(unverified, verified):
+        _verify_cache[entry] = valid
+    results = []
+    for entry in entries:
+        _verify_cache.move_to_end(entry)  # mark as recently used
+        results.append(_verify_cache[entry])
+    while len(_verify_cache) > VERIFY_CACHE_SIZE:
+        _verify_cache.popitem(last=False)  # evict least recently used result
+    return results
+
+
 def get_hash(obj):
     """Returns the hash (string, as hexadecimal digest) of the object based on its type."""
-    hash_func = hashlib.sha1  # not secure hash function, but used here for memory purposes
-    hash_message = str(obj).encode()
-    return hash_func(hash_message).hexdigest()
+    # SHA-256 runs on the SHA extensions of modern CPUs (through OpenSSL), so it costs about as much as SHA1 while
+    # being secure. The digest is truncated to 20 bytes (40 hex characters) for memory purposes, like SHA1's.
+    return hashlib.sha256(str(obj).encode()).hexdigest()[:40]
 
 
 def get_formatted_time_str(date_obj):
     """Returns a string representation of a date object as Y-M-D H:M"""
-    return date_obj.strftime("%Y-%m-%d %H:%M")
+    return _get_formatted_minute(date_obj.year, date_obj.month, date_obj.day, date_obj.hour, date_obj.minute)
+
+
+@lru_cache(maxsize=1024)
+def _get_formatted_minute(year, month, day, hour, minute):
+    """Formats a minute as Y-M-D H:M. Cached, since transactions created within the same minute share their
+    formatted time and strftime is slow compared to the cache lookup."""
+    return datetime.datetime(year, month, day, hour, minute).strftime("%Y-%m-%d %H:%M")
 
 
 def get_input_of_type(message, expected_type, allowed_inputs=None):
@@ -78,7 +135,7 @@ def get_input_of_type(message, expected_type, allowed_inputs=None):
                 print('Unexpected input')
                 continue
             break
-        except:
+        except (ValueError, TypeError):
             print("Wrong type of input")
     return user_input
 